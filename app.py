@@ -1,59 +1,373 @@
+import os
 import streamlit as st
-import pandas as pd
+import numpy as np
+
+# PANDAS_BACKEND=modin répartit les traitements sur tous les cœurs (modin + ray)
+PANDAS_BACKEND = os.environ.get("PANDAS_BACKEND", "pandas")
+BACKENDS = ("pandas", "modin", "polars")
+if PANDAS_BACKEND not in BACKENDS:
+    raise ValueError(f"PANDAS_BACKEND={PANDAS_BACKEND!r} inconnu, valeurs possibles : {', '.join(BACKENDS)}")
+if PANDAS_BACKEND == "modin":
+    import modin.config as modin_config
+    import modin.pandas as pd
+    if "MODIN_ENGINE" not in os.environ:
+        modin_config.Engine.put("ray")
+    modin_config.NPartitions.put(os.cpu_count())
+else:
+    import pandas as pd
+    if int(pd.__version__.split('.')[0]) < 3:
+        # assign, set_index, reset_index et les sélections de colonnes partagent les données
+        # au lieu de les copier (comportement par défaut en pandas 3) ; les .loc par masque copient toujours
+        pd.options.mode.copy_on_write = True
+if PANDAS_BACKEND == "polars":
+    # PANDAS_BACKEND=polars : les trois outils passent par des requêtes polars paresseuses,
+    # pandas ne sert plus qu'à l'affichage et au téléchargement
+    import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import hashlib
 import io
+from concurrent.futures import ThreadPoolExecutor
+from pandas.util import hash_pandas_object
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# les fichiers chargés sont passés en memoryview (sans copie en bytes) : st.cache_data
+# les hache directement sur le tampon
+HASH_FUNCS = {memoryview: lambda vue: hashlib.blake2b(vue).digest()}
+
+def empreinte_dataframe(df):
+    # st.cache_data ne hache qu'un échantillon de 10 000 lignes au-delà de 50 000 : un fichier
+    # corrigé de même forme renverrait l'ancien résultat, toutes les lignes sont donc hachées
+    if PANDAS_BACKEND == "modin":
+        # st.cache_data ne sait pas hacher les DataFrame modin
+        df = to_pandas(df)
+    lignes = hash_pandas_object(df, index=True).to_numpy()
+    return tuple(df.columns), tuple(map(str, df.dtypes)), hashlib.blake2b(lignes).digest()
+
+if PANDAS_BACKEND == "modin":
+    from modin.pandas.io import to_pandas
+HASH_FUNCS[pd.DataFrame] = empreinte_dataframe
+
+LIGNES_APERCU = 1000
+# colonnes requises par chaque outil
+COLONNES_NETTOYAGE = ("N° compteur", "Date", "Index")
+COLONNES_DIAMETRES = ("Numéro de compteur", "Diametre")
+# format de téléchargement : (extension, type MIME)
+FORMATS_EXPORT = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Feather": ("feather", "application/vnd.apache.arrow.file"),
+}
+# identifiants lus tels quels (zéros en tête conservés), communs aux trois outils
+DTYPES = {'N° compteur': 'string[pyarrow]', 'Numéro de compteur': 'string[pyarrow]', 'Réf. abonné': 'string[pyarrow]'}
+
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
+def lire_csv(contenu, dtype=DTYPES, colonnes=None):
+    # engine='pyarrow' de pandas n'applique dtype qu'après la lecture (les zéros en tête
+    # des numéros de compteur seraient perdus) : les types sont donc passés à pyarrow
+    types_colonnes = {col: pa.string() for col in (dtype or {})}
+    # clé des regroupements et comparaisons : encodée en dictionnaire dès la lecture,
+    # pandas la reçoit directement en category (codes entiers plutôt que chaînes)
+    types_colonnes['N° compteur'] = pa.dictionary(pa.int32(), pa.string())
+    options_lecture = pa_csv.ParseOptions(delimiter=';')
+    try:
+        # pyarrow reconnaît les dates ISO, que le moteur C de pandas laissait en texte
+        # (et qui ressortiraient reformatées dans les fichiers téléchargés) : le schéma
+        # déduit du premier bloc sert à garder ces colonnes telles quelles
+        schema = pa_csv.open_csv(
+            pa.py_buffer(contenu),
+            parse_options=options_lecture,
+            convert_options=pa_csv.ConvertOptions(column_types=types_colonnes, include_columns=colonnes),
+        ).schema
+        types_colonnes.update({champ.name: pa.string() for champ in schema if pa.types.is_temporal(champ.type)})
+        table = pa_csv.read_csv(
+            pa.py_buffer(contenu),
+            parse_options=options_lecture,
+            convert_options=pa_csv.ConvertOptions(
+                column_types=types_colonnes, include_columns=colonnes, strings_can_be_null=True
+            ),
+        )
+        df = table.to_pandas(types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
+        if 'N° compteur' in df.columns:
+            # le dictionnaire suit l'ordre d'apparition, pandas trie les catégories
+            compteurs = df['N° compteur']
+            df['N° compteur'] = compteurs.cat.reorder_categories(compteurs.cat.categories.sort_values())
+        if PANDAS_BACKEND == "modin":
+            df = pd.DataFrame(df)
+    except (pa.ArrowInvalid, pa.ArrowKeyError):
+        # fichier que pyarrow refuse (ou colonne demandée absente) : on retombe sur le
+        # moteur C de pandas, qui ignore les colonnes absentes et laisse l'appelant le signaler
+        usecols = (lambda col: col in colonnes) if colonnes else None
+        df = pd.read_csv(io.BytesIO(contenu), sep=';', dtype=dtype, usecols=usecols, dtype_backend='pyarrow', low_memory=False)
+        if 'N° compteur' in df.columns:
+            df['N° compteur'] = df['N° compteur'].astype('category')
+    # entiers (index, diamètres...) ramenés à la plus petite largeur exacte ;
+    # les décimaux restent en 64 bits pour ne pas arrondir les relevés
+    for col in df.select_dtypes('integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
+def lire_excel(contenu, dtype=DTYPES, colonnes=None):
+    usecols = (lambda col: col in colonnes) if colonnes else None
+    return pd.read_excel(io.BytesIO(contenu), dtype=dtype, usecols=usecols, engine='openpyxl')
+
+def lire_csv_polars(contenu, dtype=DTYPES):
+    # mêmes marqueurs de valeur vide que le lecteur pyarrow du chemin pandas ('NA', 'n/a'...)
+    return pl.scan_csv(
+        io.BytesIO(contenu),
+        separator=';',
+        schema_overrides={col: pl.Utf8 for col in (dtype or {})},
+        null_values=pa_csv.ConvertOptions().null_values,
+    )
+
+def signaler_diametres_multiples(numeros):
+    exemples = ", ".join(str(numero) for numero in numeros[:5])
+    suite = ", ..." if len(numeros) > 5 else ""
+    st.error(
+        f"Le fichier des diamètres donne plusieurs diamètres différents pour {len(numeros)} compteur(s) "
+        f"de l'extraction ({exemples}{suite})."
+    )
 
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
 def ajouter_diametres(df_extraction, df_diametres):
     if "N° compteur" not in df_extraction.columns:
         st.error("Le fichier d'extraction doit avoir une colonne 'N° compteur'.")
         return pd.DataFrame()
-    if "Numéro de compteur" not in df_diametres.columns or "Diametre" not in df_diametres.columns:
+    if not set(COLONNES_DIAMETRES).issubset(df_diametres.columns):
         st.error("Le fichier des diamètres doit avoir les colonnes 'Numéro de compteur' et 'Diametre'.")
         return pd.DataFrame()
 
-    df_fusionne = pd.merge(
-        df_extraction, 
-        df_diametres[['Numéro de compteur', 'Diametre']], 
-        left_on='N° compteur', 
-        right_on='Numéro de compteur', 
-        how='left'
+    # une seule colonne côté droit, indexée par le numéro : pas de clé en double à supprimer ;
+    # seuls les compteurs de l'extraction comptent (les lignes sans numéro n'en font pas partie)
+    compteurs = df_extraction['N° compteur']
+    connus = compteurs.cat.categories if isinstance(compteurs.dtype, pd.CategoricalDtype) else compteurs.dropna().unique()
+    diametres = df_diametres[['Numéro de compteur', 'Diametre']].drop_duplicates()
+    diametres = diametres[diametres['Numéro de compteur'].isin(connus)]
+    numeros = diametres['Numéro de compteur']
+    if numeros.duplicated().any():
+        signaler_diametres_multiples(numeros[numeros.duplicated()].unique())
+        return pd.DataFrame()
+    diametres = diametres.set_index('Numéro de compteur')['Diametre']
+
+    if isinstance(compteurs.dtype, pd.CategoricalDtype):
+        # mêmes catégories des deux côtés : la jointure compare directement les codes
+        diametres.index = diametres.index.astype(compteurs.dtype)
+
+    df_fusionne = df_extraction.merge(
+        diametres,
+        left_on='N° compteur',
+        right_index=True,
+        how='left',
+        validate='m:1'
     )
     
-    df_fusionne = df_fusionne.drop(columns=['Numéro de compteur'])
-    
     return df_fusionne
 
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
+def ajouter_diametres_polars(contenu_extraction, contenu_diametres, excel=False):
+    lf_extraction = lire_csv_polars(contenu_extraction)
+    if excel:
+        lf_diametres = pl.from_pandas(lire_excel(contenu_diametres, colonnes=COLONNES_DIAMETRES)).lazy()
+    else:
+        lf_diametres = lire_csv_polars(contenu_diametres)
+    if "N° compteur" not in lf_extraction.collect_schema().names():
+        st.error("Le fichier d'extraction doit avoir une colonne 'N° compteur'.")
+        return pd.DataFrame()
+    if not set(COLONNES_DIAMETRES).issubset(lf_diametres.collect_schema().names()):
+        st.error("Le fichier des diamètres doit avoir les colonnes 'Numéro de compteur' et 'Diametre'.")
+        return pd.DataFrame()
+
+    # seuls les compteurs de l'extraction comptent (la semi-jointure écarte aussi les numéros vides)
+    diametres = (
+        lf_diametres.select(['Numéro de compteur', 'Diametre'])
+        .unique(maintain_order=True)
+        .rename({'Numéro de compteur': 'N° compteur'})
+        .join(lf_extraction.select('N° compteur').unique(), on='N° compteur', how='semi', maintain_order='left')
+        .collect(engine='streaming')
+    )
+    doublons = diametres['N° compteur'].is_duplicated()
+    if doublons.any():
+        signaler_diametres_multiples(diametres['N° compteur'].filter(doublons).unique(maintain_order=True).to_list())
+        return pd.DataFrame()
+
+    df_fusionne = (
+        lf_extraction.join(diametres.lazy(), on='N° compteur', how='left', maintain_order='left')
+        .collect(engine='streaming')
+    )
+    return df_fusionne.to_pandas(use_pyarrow_extension_array=True)
+
+def convertir_dates(serie):
+    # format JJ/MM/AAAA (avec heure si la première valeur en a une) des relevés : analyse
+    # rapide en C, l'inférence dayfirst (lente, ligne à ligne) ne sert qu'aux valeurs restantes
+    premiere = serie.first_valid_index()
+    avec_heure = premiere is not None and ':' in str(serie.loc[premiere])
+    format_date = '%d/%m/%Y %H:%M:%S' if avec_heure else '%d/%m/%Y'
+    dates = pd.to_datetime(serie, format=format_date, errors='coerce')
+    a_relire = dates.isna() & serie.notna()
+    if a_relire.any():
+        # dates ISO (AAAA-MM-JJ) d'abord : l'inférence dayfirst les lirait en AAAA-JJ-MM
+        dates[a_relire] = pd.to_datetime(serie[a_relire], format='ISO8601', errors='coerce')
+        a_relire = dates.isna() & serie.notna()
+    if a_relire.any():
+        dates[a_relire] = pd.to_datetime(serie[a_relire], errors='coerce', dayfirst=True)
+    return dates
+
+def signaler_dates_ignorees(nb_ignorees, positions):
+    if nb_ignorees:
+        # numéros de ligne du fichier : en-tête + numérotation à partir de 1
+        lignes = [str(i + 2) for i in positions]
+        suite = ", ..." if nb_ignorees > len(lignes) else ""
+        st.warning(
+            f"{nb_ignorees} ligne(s) ignorée(s) car la date est vide ou illisible "
+            f"(lignes {', '.join(lignes)}{suite})."
+        )
+
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
 def nettoyer_fichier(df):
-    colonnes_requises = ["N° compteur", "Date", "Index"]
-    if not all(col in df.columns for col in colonnes_requises):
-        cols_manquantes = [col for col in colonnes_requises if col not in df.columns]
+    colonnes = set(df.columns)
+    cols_manquantes = [col for col in COLONNES_NETTOYAGE if col not in colonnes]
+    if cols_manquantes:
         st.error(f"Erreur : il manque les colonnes suivantes : {', '.join(cols_manquantes)}")
         return pd.DataFrame()
 
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce', dayfirst=True)
-    df.dropna(subset=['Date'], inplace=True)
+    dates = convertir_dates(df['Date'])
+    dates_valides = dates.notna()
+    signaler_dates_ignorees(int((~dates_valides).sum()), df.index[~dates_valides][:10])
     
-    df_trie = df.sort_values(by=["N° compteur", "Date"], ascending=[True, False])
-    df_filtre = df_trie[pd.notna(df_trie['Index']) & (df_trie['Index'].astype(str).str.strip() != '')]
-    df_final = df_filtre.drop_duplicates(subset="N° compteur", keep="first")
+    index = df['Index']
+    if pd.api.types.is_numeric_dtype(index):
+        index_valide = index.notna()
+    else:
+        if not pd.api.types.is_string_dtype(index) or index.dtype == object:
+            # colonnes texte venues d'un autre lecteur que pyarrow : converties une fois en Arrow
+            index = index.astype('string[pyarrow]')
+        index_valide = (index.str.strip().str.len() > 0).fillna(False)
+
+    # un seul masque pour la date et l'index : le regroupement travaille sur deux colonnes,
+    # seules les lignes retenues sont extraites du fichier complet
+    valides = dates_valides & index_valide
+    idx_recents = dates.loc[valides].groupby(df.loc[valides, "N° compteur"], observed=True, dropna=False).idxmax()
+    df_final = df.loc[idx_recents].assign(Date=dates.loc[idx_recents])
     
     return df_final
 
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
+def nettoyer_fichier_polars(contenu):
+    lf = lire_csv_polars(contenu)
+    colonnes = lf.collect_schema().names()
+    cols_manquantes = [col for col in COLONNES_NETTOYAGE if col not in colonnes]
+    if cols_manquantes:
+        st.error(f"Erreur : il manque les colonnes suivantes : {', '.join(cols_manquantes)}")
+        return pd.DataFrame()
+
+    # les relevés répètent peu de dates différentes : chacune est convertie une fois par
+    # convertir_dates, dans l'ordre d'apparition (mêmes formats retenus que le chemin pandas)
+    lf = lf.with_columns(pl.col('Date').cast(pl.Utf8))
+    valeurs = lf.select(pl.col('Date').unique(maintain_order=True)).collect(engine='streaming')['Date'].to_pandas()
+    correspondance = pl.from_pandas(pd.DataFrame({'Date': valeurs, 'date_lue': convertir_dates(valeurs)}))
+    lf_dates = (
+        lf.with_row_index('ligne')
+        .join(correspondance.lazy(), on='Date', how='left', maintain_order='left')
+        .with_columns(pl.col('date_lue').alias('Date'))
+    )
+    # lignes sans date lisible comptées dans la même lecture que le nettoyage
+    ignorees = lf_dates.filter(pl.col('Date').is_null()).select(
+        pl.len().alias('nb'), pl.col('ligne').head(10).implode().alias('positions')
+    )
+    resultat = (
+        lf_dates.drop_nulls('Date')
+        .filter(pl.col('Index').cast(pl.Utf8).str.strip_chars().str.len_chars() > 0)
+        .group_by('N° compteur')
+        .agg(pl.all().get(pl.col('Date').arg_max()))
+        .select(colonnes)
+        .sort('N° compteur', nulls_last=True)
+    )
+    df_ignorees, df_final = pl.collect_all([ignorees, resultat], engine='streaming')
+    signaler_dates_ignorees(df_ignorees['nb'].item(), df_ignorees['positions'].item().to_list())
+    # colonnes Arrow comme le chemin pandas (entiers avec vides non convertis en décimaux),
+    # la date en datetime64 pour être écrite à l'identique dans les téléchargements
+    return df_final.to_pandas(use_pyarrow_extension_array=True).astype({'Date': 'datetime64[ns]'})
+
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
 def comparer_fichiers(df1, df2):
     if 'N° compteur' not in df1.columns or 'N° compteur' not in df2.columns:
         st.error("La colonne 'N° compteur' doit exister dans les deux fichiers.")
         return pd.DataFrame()
     
-    compteurs_f1 = set(df1['N° compteur'])
-    compteurs_f2 = set(df2['N° compteur'])
-    compteurs_manquants = compteurs_f1 - compteurs_f2
-    resultat = df1[df1['N° compteur'].isin(compteurs_manquants)].copy()
-    
-    return resultat
+    compteurs = df1['N° compteur']
+    if isinstance(compteurs.dtype, pd.CategoricalDtype):
+        # table de présence indexée par les codes de catégorie de df1, la dernière
+        # case (code -1) correspondant aux compteurs vides
+        positions = compteurs.cat.categories.get_indexer(df2['N° compteur'].dropna().unique())
+        presents = np.zeros(len(compteurs.cat.categories) + 1, dtype=bool)
+        presents[positions[positions >= 0]] = True
+        presents[-1] = df2['N° compteur'].isna().any()
+        return df1.loc[~presents[compteurs.cat.codes.to_numpy()]]
+
+    return df1.loc[~compteurs.isin(df2['N° compteur'].unique())]
+
+@st.cache_data(show_spinner=False, hash_funcs=HASH_FUNCS)
+def comparer_fichiers_polars(contenu1, contenu2):
+    lf1 = lire_csv_polars(contenu1)
+    lf2 = lire_csv_polars(contenu2)
+    if 'N° compteur' not in lf1.collect_schema().names() or 'N° compteur' not in lf2.collect_schema().names():
+        st.error("La colonne 'N° compteur' doit exister dans les deux fichiers.")
+        return pd.DataFrame()
+
+    # anti-jointure : les lignes de df1 dont le compteur n'apparaît pas dans df2
+    df_manquants = (
+        lf1.join(lf2.select('N° compteur').unique(), on='N° compteur', how='anti', nulls_equal=True, maintain_order='left')
+        .collect(engine='streaming')
+    )
+    return df_manquants.to_pandas(use_pyarrow_extension_array=True)
+
+def executeur_streamlit(nb_threads):
+    # lectures simultanées des deux fichiers : pyarrow relâche le GIL pendant l'analyse ;
+    # les threads reçoivent le contexte de la session pour le cache et les messages st.*
+    return ThreadPoolExecutor(nb_threads, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx()))
+
+def empreinte_fichiers(*fichiers):
+    return tuple(hashlib.blake2b(fichier.getbuffer(), digest_size=8).hexdigest() for fichier in fichiers)
+
+def lire_fichier_session(cle, fichier, lecture, **kwargs):
+    # DataFrame gardé en session tant que le contenu du fichier ne change pas : les reruns
+    # (téléchargement, aperçu) évitent même la désérialisation d'un résultat de st.cache_data
+    empreinte = empreinte_fichiers(fichier)
+    if st.session_state.get(f'hash_{cle}') != empreinte:
+        st.session_state[f'df_{cle}'] = lecture(fichier.getbuffer(), **kwargs)
+        st.session_state[f'hash_{cle}'] = empreinte
+    return st.session_state[f'df_{cle}']
+
+def exporter_csv(df):
+    # écrit directement les octets UTF-8, par blocs de lignes plutôt qu'en une seule chaîne
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, sep=';', encoding='utf-8', chunksize=65536)
+    return buffer.getvalue()
+
+def exporter(df, format_export):
+    if format_export == "CSV":
+        return exporter_csv(df)
+    # formats colonnes : écrits par le moteur C++ d'Arrow, sans formatage texte cellule par cellule
+    buffer = io.BytesIO()
+    if format_export == "Parquet":
+        df.to_parquet(buffer, engine='pyarrow', compression='zstd', index=False)
+    else:
+        df.reset_index(drop=True).to_feather(buffer, compression='zstd')
+    return buffer.getvalue()
+
+def afficher_apercu(df):
+    # seul un aperçu part vers le navigateur, le fichier complet reste dans le téléchargement
+    st.dataframe(df.head(LIGNES_APERCU))
+    if len(df) > LIGNES_APERCU:
+        st.caption(f"Affichage des {LIGNES_APERCU:,} premières lignes sur {len(df):,}.".replace(',', ' '))
 
 st.set_page_config(page_title="Outils CSV", layout="wide")
 
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Choisis un outil :", ["Ajout Diamètre", "Nettoyage Doublons", "Comparaison Fichiers"])
+format_export = st.sidebar.radio("Format de téléchargement :", list(FORMATS_EXPORT))
+extension, mime_export = FORMATS_EXPORT[format_export]
 
 if page == "Ajout Diamètre":
     st.title("Outil d'Ajout de Diamètre")
@@ -70,36 +384,50 @@ if page == "Ajout Diamètre":
     fichier_diametres = col2.file_uploader("Fichier 2 (Diamètres)", type=["csv", "xlsx"])
 
     if fichier_extraction and fichier_diametres:
-        if st.button("Lancer l'ajout des diamètres", type="primary"):
-            try:
-                dtype_spec = {'N° compteur': str, 'Numéro de compteur': str, 'Réf. abonné': str}
-                df1 = pd.read_csv(fichier_extraction, sep=';', dtype=dtype_spec)
-                
-                if fichier_diametres.name.endswith('.csv'):
-                    df2 = pd.read_csv(fichier_diametres, sep=';', dtype=dtype_spec)
-                else: # .xlsx
-                    df2 = pd.read_excel(fichier_diametres, dtype=dtype_spec, engine='openpyxl')
+        try:
+            fichiers_fusion = empreinte_fichiers(fichier_extraction, fichier_diametres)
+            if st.button("Lancer l'ajout des diamètres", type="primary"):
+                if PANDAS_BACKEND == "polars":
+                    with st.spinner("Fusion en cours..."):
+                        df_final = ajouter_diametres_polars(
+                            fichier_extraction.getbuffer(),
+                            fichier_diametres.getbuffer(),
+                            excel=not fichier_diametres.name.endswith('.csv'),
+                        )
+                else:
+                    with executeur_streamlit(2) as executeur:
+                        lecture1 = executeur.submit(lire_csv, fichier_extraction.getbuffer())
+                        # seules les colonnes numéro + diamètre du fichier 2 sont utilisées
+                        if fichier_diametres.name.endswith('.csv'):
+                            lecture2 = executeur.submit(lire_csv, fichier_diametres.getbuffer(), colonnes=list(COLONNES_DIAMETRES))
+                        else: # .xlsx
+                            lecture2 = executeur.submit(lire_excel, fichier_diametres.getbuffer(), colonnes=COLONNES_DIAMETRES)
+                    df1, df2 = lecture1.result(), lecture2.result()
 
-                with st.spinner("Fusion en cours..."):
-                    df_final = ajouter_diametres(df1, df2)
-                
+                    with st.spinner("Fusion en cours..."):
+                        df_final = ajouter_diametres(df1, df2)
+                # gardé en session avec l'empreinte des deux fichiers : changer de format de
+                # téléchargement ne relance pas la fusion, changer de fichier masque l'ancien résultat
+                st.session_state['df_avec_diametres'] = df_final
+                st.session_state['hash_avec_diametres'] = fichiers_fusion
                 st.success("Opération terminée !")
+
+            if st.session_state.get('hash_avec_diametres') == fichiers_fusion:
+                df_final = st.session_state['df_avec_diametres']
                 st.subheader("Aperçu du fichier final avec les diamètres")
-                st.dataframe(df_final)
+                afficher_apercu(df_final)
 
-                buffer = io.StringIO()
-                df_final.to_csv(buffer, index=False, sep=';')
-                csv_final = buffer.getvalue().encode('utf-8')
+                donnees_export = exporter(df_final, format_export)
 
                 st.download_button(
-                    label="Télécharger le fichier final (CSV)",
-                    data=csv_final,
-                    file_name="extraction_avec_diametres.csv",
-                    mime="text/csv",
+                    label=f"Télécharger le fichier final ({format_export})",
+                    data=donnees_export,
+                    file_name=f"extraction_avec_diametres.{extension}",
+                    mime=mime_export,
                 )
             
-            except Exception as e:
-                st.error(f"Oups, une erreur est survenue : {e}")
+        except Exception as e:
+            st.error(f"Oups, une erreur est survenue : {e}")
 
 elif page == "Nettoyage Doublons":
     st.title("Outil de Nettoyage CSV")
@@ -111,39 +439,51 @@ elif page == "Nettoyage Doublons":
     - Il vérifie que la colonne **"Index"** de cette ligne n'est pas vide.
     """)
 
-    fichier_charge = st.file_uploader("Sélectionne un fichier CSV", type="csv")
+    # le formulaire ne relance le script qu'à la validation, pas à chaque interaction
+    with st.form("formulaire_nettoyage"):
+        fichier_charge = st.file_uploader("Sélectionne un fichier CSV", type="csv")
+        lancer_nettoyage = st.form_submit_button("Lancer le nettoyage", type="primary")
 
     if fichier_charge is not None:
         try:
-            df_initial = pd.read_csv(fichier_charge, sep=';', dtype={'Réf. abonné': str, 'N° compteur': str})
+            if PANDAS_BACKEND == "polars":
+                # seules les premières lignes sont lues pour l'aperçu, le nettoyage relit le fichier en flux
+                lf_initial = lire_csv_polars(fichier_charge.getbuffer())
+                apercu_initial = lf_initial.head(5).collect().to_pandas()
+            else:
+                df_initial = lire_fichier_session('nettoyage', fichier_charge, lire_csv)
+                apercu_initial = df_initial.head()
             st.subheader("Aperçu du fichier original")
-            st.dataframe(df_initial.head())
+            st.dataframe(apercu_initial)
 
-            if st.button("Lancer le nettoyage", type="primary"):
+            if lancer_nettoyage:
                 with st.spinner("Nettoyage en cours..."):
-                    df_nettoye = nettoyer_fichier(df_initial)
+                    if PANDAS_BACKEND == "polars":
+                        df_nettoye = nettoyer_fichier_polars(fichier_charge.getbuffer())
+                        lignes_originales = lf_initial.select(pl.len()).collect(engine='streaming').item()
+                    else:
+                        df_nettoye = nettoyer_fichier(df_initial)
+                        lignes_originales = len(df_initial)
                     st.session_state['df_nettoye'] = df_nettoye
-                    st.session_state['lignes_originales'] = len(df_initial)
+                    st.session_state['lignes_originales'] = lignes_originales
                 st.success("C'est terminé !")
             
             if 'df_nettoye' in st.session_state:
                 st.header("2. Résultat")
                 resultat_nettoyage = st.session_state['df_nettoye']
-                st.dataframe(resultat_nettoyage)
+                afficher_apercu(resultat_nettoyage)
 
                 col1, col2 = st.columns(2)
                 col1.metric("Lignes avant", st.session_state['lignes_originales'])
                 col2.metric("Lignes après", len(resultat_nettoyage))
                 
-                buffer = io.StringIO()
-                resultat_nettoyage.to_csv(buffer, index=False, sep=';')
-                csv_final = buffer.getvalue().encode('utf-8')
+                donnees_export = exporter(resultat_nettoyage, format_export)
 
                 st.download_button(
-                    label="Télécharger le résultat (CSV)",
-                    data=csv_final,
-                    file_name="fichier_nettoye.csv",
-                    mime="text/csv",
+                    label=f"Télécharger le résultat ({format_export})",
+                    data=donnees_export,
+                    file_name=f"fichier_nettoye.{extension}",
+                    mime=mime_export,
                 )
         except Exception as e:
             st.error(f"Oups, une erreur est survenue : {e}")
@@ -158,38 +498,51 @@ elif page == "Comparaison Fichiers":
     3.  Cliquez sur "Comparer" pour obtenir la liste des manquants.
     """)
 
-    col1, col2 = st.columns(2)
-    fichier1 = col1.file_uploader("Fichier 1 (de référence)", type="csv")
-    fichier2 = col2.file_uploader("Fichier 2 (à comparer)", type="csv")
+    with st.form("formulaire_comparaison"):
+        col1, col2 = st.columns(2)
+        fichier1 = col1.file_uploader("Fichier 1 (de référence)", type="csv")
+        fichier2 = col2.file_uploader("Fichier 2 (à comparer)", type="csv")
+        lancer_comparaison = st.form_submit_button("Comparer", type="primary")
 
     if fichier1 and fichier2:
-        if st.button("Comparer", type="primary"):
-            try:
-                df1 = pd.read_csv(fichier1, sep=';', dtype={'Réf. abonné': str, 'N° compteur': str})
-                df2 = pd.read_csv(fichier2, sep=';', dtype={'Réf. abonné': str, 'N° compteur': str})
+        try:
+            fichiers_comparaison = empreinte_fichiers(fichier1, fichier2)
+            if lancer_comparaison:
+                if PANDAS_BACKEND == "polars":
+                    with st.spinner("Comparaison en cours..."):
+                        df_manquants = comparer_fichiers_polars(fichier1.getbuffer(), fichier2.getbuffer())
+                else:
+                    with executeur_streamlit(2) as executeur:
+                        lecture1 = executeur.submit(lire_csv, fichier1.getbuffer())
+                        # seul le numéro de compteur du fichier 2 est utilisé
+                        lecture2 = executeur.submit(lire_csv, fichier2.getbuffer(), colonnes=['N° compteur'])
+                    df1, df2 = lecture1.result(), lecture2.result()
 
-                with st.spinner("Comparaison en cours..."):
-                    df_manquants = comparer_fichiers(df1, df2)
-                
+                    with st.spinner("Comparaison en cours..."):
+                        df_manquants = comparer_fichiers(df1, df2)
+                # gardé en session avec l'empreinte des deux fichiers, comme pour la fusion
+                st.session_state['df_manquants'] = df_manquants
+                st.session_state['hash_manquants'] = fichiers_comparaison
+
+            if st.session_state.get('hash_manquants') == fichiers_comparaison:
+                df_manquants = st.session_state['df_manquants']
                 st.success(f"Analyse terminée : **{len(df_manquants)}** compteur(s) sont manquants.")
 
                 if not df_manquants.empty:
                     st.subheader("Liste des compteurs manquants")
-                    st.dataframe(df_manquants)
+                    afficher_apercu(df_manquants)
 
-                    buffer_comp = io.StringIO()
-                    df_manquants.to_csv(buffer_comp, index=False, sep=';')
-                    csv_comp = buffer_comp.getvalue().encode('utf-8')
+                    donnees_export = exporter(df_manquants, format_export)
 
                     st.download_button(
-                        label="Télécharger la liste (CSV)",
-                        data=csv_comp,
-                        file_name="compteurs_manquants.csv",
-                        mime="text/csv",
+                        label=f"Télécharger la liste ({format_export})",
+                        data=donnees_export,
+                        file_name=f"compteurs_manquants.{extension}",
+                        mime=mime_export,
                     )
                 else:
                     st.info("Bonne nouvelle, aucun compteur ne manque !")
             
-            except Exception as e:
-                st.error(f"Oups, une erreur est survenue : {e}")
+        except Exception as e:
+            st.error(f"Oups, une erreur est survenue : {e}")
 